@@ -1,10 +1,38 @@
 from flask import Flask, render_template, request, redirect, url_for, session, jsonify
 from db import create_connection
+import bcrypt
 import mysql.connector
+import redis
 
 app = Flask(__name__)
 app.secret_key = 'your_secret_key' # Change this to a secure, random key
 
+def close_connection(conn):
+    """Closes a connection, ignoring errors from one that is already broken."""
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+# Shared with the teacher portal, which caches each teacher's schedule responses.
+cache = redis.Redis(host='localhost', port=6379)
+
+def invalidate_teacher_schedule(*teacher_ids):
+    """Drops the teacher portal's cached schedule responses for the given teachers."""
+    keys = [key for teacher_id in teacher_ids
+            for key in (f"teacher:{teacher_id}:schedule", f"teacher:{teacher_id}:all_classes")]
+    if not keys:
+        return
+    try:
+        cache.delete(*keys)
+    except redis.RedisError:
+        pass
+
+def scheduled_teacher_ids(cursor, column, value):
+    """Returns the teachers with a schedule whose given column matches value."""
+    cursor.execute(f"SELECT DISTINCT teacher_id FROM Schedules WHERE {column} = %s", (value,))
+    return [row[0] for row in cursor.fetchall()]
+
 # --- Authentication ---
 @app.route('/', methods=['GET', 'POST'])
 def login():
@@ -27,9 +55,8 @@ def login():
         except mysql.connector.Error as err:
             return render_template('login.html', error=f'Database error: {err}')
         finally:
-            if 'conn' in locals() and conn.is_connected():
-                cursor.close()
-                conn.close()
+            if 'conn' in locals() and conn:
+                close_connection(conn)
     return render_template('login.html')
 
 @app.route('/logout')
@@ -64,7 +91,7 @@ def get_classes():
         cursor.execute("SELECT class_id as id, class_name as name FROM Classes ORDER BY name")
         return jsonify({'success': True, 'data': cursor.fetchall()})
     finally:
-        if conn and conn.is_connected(): conn.close()
+        close_connection(conn)
 
 @app.route('/subjects')
 @admin_required
@@ -76,7 +103,7 @@ def get_subjects():
         cursor.execute("SELECT subject_id as id, subject_name as name FROM Subjects ORDER BY subject_name")
         return jsonify({'success': True, 'data': cursor.fetchall()})
     finally:
-        if conn and conn.is_connected(): conn.close()
+        close_connection(conn)
 
 @app.route('/teachers')
 @admin_required
@@ -88,7 +115,7 @@ def get_teachers():
         cursor.execute("SELECT teacher_id as id, name FROM Teachers ORDER BY name")
         return jsonify({'success': True, 'data': cursor.fetchall()})
     finally:
-        if conn and conn.is_connected(): conn.close()
+        close_connection(conn)
 
 @app.route('/api/batches')
 @admin_required
@@ -104,7 +131,7 @@ def get_batches():
     except mysql.connector.Error as err:
         return jsonify({'success': False, 'message': f"Database Error: {err}"}), 500
     finally:
-        if conn and conn.is_connected(): conn.close()
+        close_connection(conn)
 
 @app.route('/api/schedules')
 @admin_required
@@ -131,7 +158,7 @@ def get_schedules():
             schedule['end_time'] = str(schedule['end_time'])
         return jsonify({'success': True, 'data': schedules})
     finally:
-        if conn and conn.is_connected(): conn.close()
+        close_connection(conn)
 
 # --- API Endpoints for Data Management ---
 
@@ -148,6 +175,9 @@ def create_user_api():
 
     if not all([user_type, name, email, password]) or (user_type == 'student' and not batch):
         return jsonify({'success': False, 'message': 'Missing required fields.'}), 400
+    if user_type == 'teacher' and len(password.encode()) > 72:
+        # bcrypt only accepts passwords up to 72 bytes
+        return jsonify({'success': False, 'message': 'Password must be at most 72 bytes.'}), 400
     
     conn = create_connection()
     if not conn: return jsonify({'success': False, 'message': 'Database error'}), 500
@@ -166,8 +196,10 @@ def create_user_api():
             query = f"INSERT INTO {table_name} (name, email, password, batch) VALUES (%s, %s, %s, %s)"
             cursor.execute(query, (name, email, password, batch))
         else:
-            query = f"INSERT INTO {table_name} (name, email, password) VALUES (%s, %s, %s)"
-            cursor.execute(query, (name, email, password))
+            # Teacher passwords are stored as bcrypt hashes
+            password_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+            query = f"INSERT INTO {table_name} (name, email, password_hash) VALUES (%s, %s, %s)"
+            cursor.execute(query, (name, email, password_hash))
         conn.commit()
         return jsonify({'success': True, 'message': f"{user_type.capitalize()} created successfully!"})
     except mysql.connector.Error as err:
@@ -175,7 +207,7 @@ def create_user_api():
         if err.errno == 1062: return jsonify({'success': False, 'message': f'Error: Email "{email}" already exists.'}), 409
         return jsonify({'success': False, 'message': f"Database Error: {err}"}), 500
     finally:
-        if conn.is_connected(): conn.close()
+        close_connection(conn)
 
 @app.route('/api/schedule_class', methods=['POST'])
 @admin_required
@@ -202,12 +234,13 @@ def schedule_class_api():
         values = (data['class_id'], data['subject_id'], data['teacher_id'], data['batch'], data['day_of_week'], data['start_time'], data['end_time'])
         cursor.execute(insert_query, values)
         conn.commit()
+        invalidate_teacher_schedule(data['teacher_id'])
         return jsonify({'success': True, 'message': "Class scheduled successfully!"})
     except mysql.connector.Error as err:
         conn.rollback()
         return jsonify({'success': False, 'message': f"Database Error: {err}"}), 500
     finally:
-        if conn.is_connected(): conn.close()
+        close_connection(conn)
 
 @app.route('/api/remove_schedule', methods=['POST'])
 @admin_required
@@ -218,16 +251,19 @@ def remove_schedule_api():
     if not conn: return jsonify({'success': False, 'message': 'Database error'}), 500
     try:
         cursor = conn.cursor()
+        cursor.execute("SELECT teacher_id FROM Schedules WHERE schedule_id = %s", (schedule_id,))
+        schedule = cursor.fetchone()
         cursor.execute("DELETE FROM Schedules WHERE schedule_id = %s", (schedule_id,))
         conn.commit()
         if cursor.rowcount == 0:
             return jsonify({'success': False, 'message': 'Schedule not found.'}), 404
+        invalidate_teacher_schedule(schedule[0])
         return jsonify({'success': True, 'message': 'Schedule removed successfully!'})
     except mysql.connector.Error as err:
         conn.rollback()
         return jsonify({'success': False, 'message': f'Database Error: {err}'}), 500
     finally:
-        if conn.is_connected(): conn.close()
+        close_connection(conn)
 
 @app.route('/api/manage_classes', methods=['POST'])
 @admin_required
@@ -237,20 +273,24 @@ def manage_classes_api():
     if not conn: return jsonify({'success': False, 'message': 'Database error'}), 500
     try:
         cursor = conn.cursor()
+        affected_teachers = []
         if action == 'add':
             cursor.execute("INSERT INTO Classes (class_name) VALUES (%s)", (data['class_name'],))
             message = "Class added successfully."
         elif action == 'remove':
+            # Schedules keep the row with class_id set to NULL, which drops it from the teacher portal
+            affected_teachers = scheduled_teacher_ids(cursor, 'class_id', data['class_id'])
             cursor.execute("DELETE FROM Classes WHERE class_id = %s", (data['class_id'],))
             message = "Class removed successfully."
         conn.commit()
+        invalidate_teacher_schedule(*affected_teachers)
         return jsonify({'success': True, 'message': message})
     except mysql.connector.Error as err:
         conn.rollback()
         if err.errno == 1451: return jsonify({'success': False, 'message': 'Cannot remove: this class is used in existing schedules.'}), 409
         return jsonify({'success': False, 'message': f"Database Error: {err}"}), 500
     finally:
-        if conn.is_connected(): conn.close()
+        close_connection(conn)
 
 @app.route('/api/manage_subjects', methods=['POST'])
 @admin_required
@@ -260,19 +300,23 @@ def manage_subjects_api():
     if not conn: return jsonify({'success': False, 'message': 'Database error'}), 500
     try:
         cursor = conn.cursor()
+        affected_teachers = []
         if action == 'add':
             cursor.execute("INSERT INTO Subjects (subject_name) VALUES (%s)", (data['subject_name'],))
             message = "Subject added successfully."
         elif action == 'remove':
+            # Schedules keep the row with subject_id set to NULL, which drops it from the teacher portal
+            affected_teachers = scheduled_teacher_ids(cursor, 'subject_id', data['subject_id'])
             cursor.execute("DELETE FROM Subjects WHERE subject_id = %s", (data['subject_id'],))
             message = "Subject removed successfully."
         conn.commit()
+        invalidate_teacher_schedule(*affected_teachers)
         return jsonify({'success': True, 'message': message})
     except mysql.connector.Error as err:
         conn.rollback()
         return jsonify({'success': False, 'message': f"Database Error: {err}"}), 500
     finally:
-        if conn.is_connected(): conn.close()
+        close_connection(conn)
 
 @app.route('/api/manage_batches', methods=['POST'])
 @admin_required
@@ -312,7 +356,7 @@ def manage_batches_api():
             return jsonify({'success': False, 'message': f'Error: Batch "{data["batch_name"]}" already exists.'}), 409
         return jsonify({'success': False, 'message': f"Database Error: {err}"}), 500
     finally:
-        if conn.is_connected(): conn.close()
+        close_connection(conn)
 
 
 if __name__ == '__main__':
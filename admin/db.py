@@ -4,15 +4,18 @@ from mysql.connector import Error
 def create_connection():
     """Create and return a database connection object."""
     
-    connection = mysql.connector.connect(
-            host='localhost', # Replace with your host
-            database='portal',
-            user='root', # Replace with your username
-            password='aditya',
-            auth_plugin='mysql_native_password'
-              
-        )
-    if connection.is_connected():
-            return connection
+    try:
+        connection = mysql.connector.connect(
+                host='localhost', # Replace with your host
+                database='portal',
+                user='root', # Replace with your username
+                password='aditya',
+                auth_plugin='mysql_native_password'
+                  
+            )
+        return connection
+    except Error as e:
+        print(f"Error while connecting to MySQL: {e}")
+        return None
   
 
@@ -0,0 +1,11 @@
+# Production server settings for the teacher portal.
+# Run from this directory with: gunicorn -c gunicorn_conf.py teacher_app:app
+# The gevent worker monkey-patches the standard library before teacher_app is imported.
+
+bind = '0.0.0.0:5001'
+worker_class = 'gevent'
+workers = 4
+# Each worker holds at most teacher_db.POOL_SIZE MySQL connections; requests beyond that
+# wait (greenlet-friendly) for a free one for up to POOL_TIMEOUT seconds, so keep the
+# accepted connections to a queue those connections can drain within that timeout.
+worker_connections = 100
@@ -1,27 +1,140 @@
 from flask import Flask, render_template, request, session, jsonify, redirect, url_for
-from teacher_db import create_connection
+from flask.json.provider import DefaultJSONProvider
+from flask_session import Session
+from teacher_db import get_conn, USING_GEVENT
 import mysql.connector
-from functools import wraps
+import redis
+import bcrypt
 import datetime
+import hmac
+import orjson
+import re
+import time
+from functools import lru_cache
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Serializes jsonify() responses with orjson; types it can't handle go through Flask's default."""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__, template_folder='templates')
+app.json = OrjsonProvider(app)
 app.secret_key = 'a_different_teacher_secret_key'
 
+# Sessions live in Redis; the cookie only carries the signed session id.
+cache = redis.Redis(host='localhost', port=6379)
+app.config.update(
+    SESSION_TYPE='redis',
+    SESSION_REDIS=cache,
+    SESSION_KEY_PREFIX='tsess:',
+    SESSION_USE_SIGNER=True,
+    SESSION_PERMANENT=False,
+    PERMANENT_SESSION_LIFETIME=datetime.timedelta(hours=8)
+)
+Session(app)
+
+AUTH_CACHE_TTL = 300  # seconds a teacher's credential record stays cached
+ATTENDANCE_BATCH_SIZE = 5000  # rows per multi-row INSERT in mark_attendance
+SCHEDULE_CACHE_TTL = 600  # seconds a teacher's schedule responses stay cached
+
+def cache_get(key):
+    """Returns the cached value for key, or None on a miss or when Redis is unavailable."""
+    try:
+        return cache.get(key)
+    except redis.RedisError:
+        return None
+
+def cache_set(key, ttl, value):
+    """Stores value under key for ttl seconds; caching is best-effort."""
+    try:
+        cache.setex(key, ttl, value)
+    except redis.RedisError:
+        pass
+
+def offload(func, *args):
+    """Runs CPU-bound work in gevent's threadpool so other greenlets keep running; inline otherwise."""
+    if USING_GEVENT:
+        from gevent import get_hub
+        return get_hub().threadpool.apply(func, args)
+    return func(*args)
+
+BCRYPT_HASH = re.compile(r'\$2[aby]\$\d{2}\$[./A-Za-z0-9]{53}')
+
+def is_bcrypt_hash(value):
+    """True for a well-formed bcrypt hash; legacy plaintext passwords may still start with '$2'."""
+    return BCRYPT_HASH.fullmatch(value) is not None
+
+def check_password(password, password_hash):
+    """Verifies a password against a stored bcrypt hash, or a legacy plaintext value."""
+    if is_bcrypt_hash(password_hash):
+        try:
+            return offload(bcrypt.checkpw, password.encode(), password_hash.encode())
+        except ValueError:
+            # Passwords over bcrypt's 72-byte limit can never have been hashed
+            return False
+    return hmac.compare_digest(password_hash.encode(), password.encode())
+
+def upgrade_password_hash(teacher, password):
+    """Replaces a teacher's legacy plaintext password with a bcrypt hash; best-effort."""
+    try:
+        password_hash = offload(bcrypt.hashpw, password.encode(), bcrypt.gensalt()).decode()
+    except ValueError:
+        # Over bcrypt's 72-byte limit; keep the legacy value rather than fail the login
+        return teacher
+    with get_conn() as conn:
+        if not conn: return teacher
+        try:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE Teachers SET password_hash = %s WHERE teacher_id = %s",
+                           (password_hash, teacher['teacher_id']))
+            conn.commit()
+            return {**teacher, 'password_hash': password_hash}
+        except mysql.connector.Error:
+            conn.rollback()
+            return teacher
+
+@lru_cache(maxsize=1)
+def _today_name(minute_bucket):
+    """Weekday name for a minute since the epoch; called with the current minute so strftime runs once a minute."""
+    return datetime.datetime.fromtimestamp(minute_bucket * 60).strftime('%A')
+
+def json_response(payload):
+    """Wraps an already serialized JSON string in a response."""
+    return app.response_class(payload, mimetype='application/json')
+
 @app.route('/')
 def index():
     """Redirects the base URL to the teacher login page."""
     return redirect(url_for('teacher_login_page'))
 
-def teacher_required(f):
-    """Decorator to ensure a user is logged in as a teacher."""
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_type' not in session or session['user_type'] != 'teacher':
-            if request.path.startswith('/api/'):
-                return jsonify({'success': False, 'message': 'Authentication required'}), 401
-            return redirect(url_for('teacher_login_page'))
-        return f(*args, **kwargs)
-    return decorated_function
+# Endpoints that require a logged-in teacher; checked once per request in require_teacher().
+PROTECTED_ENDPOINTS = {
+    'get_teacher_schedule', 'get_today_classes', 'get_all_teacher_classes',
+    'get_class_students', 'mark_attendance', 'view_attendance',
+}
+
+@app.before_request
+def require_teacher():
+    """Rejects requests to protected endpoints unless a teacher is logged in."""
+    if request.endpoint in PROTECTED_ENDPOINTS and session.get('user_type') != 'teacher':
+        return jsonify({'success': False, 'message': 'Authentication required'}), 401
+
+# Idempotent GETs that browsers revalidate by ETag; the URLs are shared by all teachers,
+# so responses must never be reused without asking the server.
+HTTP_CACHED_ENDPOINTS = {'get_teacher_schedule', 'get_all_teacher_classes'}
+
+@app.after_request
+def add_cache_headers(response):
+    """Adds an ETag to schedule responses and forces revalidation; answers 304 on a match."""
+    if request.endpoint in HTTP_CACHED_ENDPOINTS and response.status_code == 200:
+        response.add_etag()
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.vary.add('Cookie')
+        response.make_conditional(request)
+    return response
 
 @app.route('/teacher')
 def teacher_login_page():
@@ -35,21 +148,31 @@ def teacher_login_action():
     email, password = data.get('email'), data.get('password')
     if not email or not password:
         return jsonify({'success': False, 'message': 'Email and password are required.'}), 400
-    conn = create_connection()
-    if not conn: return jsonify({'success': False, 'message': 'Database error'}), 500
-    try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM Teachers WHERE email = %s AND password = %s", (email, password))
-        teacher = cursor.fetchone()
+    key = f"teacher:auth:{email}"
+    cached = cache_get(key)
+    if cached:
+        teacher = app.json.loads(cached)
+    else:
+        with get_conn() as conn:
+            if not conn: return jsonify({'success': False, 'message': 'Database error'}), 500
+            cursor = conn.cursor()
+            cursor.execute("SELECT teacher_id, name, password_hash FROM Teachers WHERE email = %s", (email,))
+            row = cursor.fetchone()
+            teacher = dict(zip(cursor.column_names, row)) if row else None
         if teacher:
-            session['user_type'] = 'teacher'
-            session['user_id'] = teacher['teacher_id']
-            session['user_name'] = teacher['name']
-            return jsonify({'success': True, 'teacher': {'name': teacher['name'], 'id': teacher['teacher_id']}})
-        else:
-            return jsonify({'success': False, 'message': 'Invalid credentials.'}), 401
-    finally:
-        if conn.is_connected(): conn.close()
+            cache_set(key, AUTH_CACHE_TTL, app.json.dumps(teacher))
+    if not teacher or not check_password(password, teacher['password_hash']):
+        return jsonify({'success': False, 'message': 'Invalid credentials.'}), 401
+    if not is_bcrypt_hash(teacher['password_hash']):
+        teacher = upgrade_password_hash(teacher, password)
+        cache_set(key, AUTH_CACHE_TTL, app.json.dumps(teacher))
+    # Issue a fresh session id so one planted before login can't be reused (session fixation)
+    session.clear()
+    app.session_interface.regenerate(session)
+    session['user_type'] = 'teacher'
+    session['user_id'] = teacher['teacher_id']
+    session['user_name'] = teacher['name']
+    return jsonify({'success': True, 'teacher': {'name': teacher['name'], 'id': teacher['teacher_id']}})
 
 @app.route('/teacher/logout', methods=['POST'])
 def teacher_logout():
@@ -70,16 +193,19 @@ def teacher_session():
     return jsonify({'logged_in': False})
 
 @app.route('/api/teacher/schedule')
-@teacher_required
 def get_teacher_schedule():
     """Fetches the weekly schedule for the logged-in teacher."""
     teacher_id = session.get('user_id')
-    conn = create_connection()
-    if not conn: return jsonify({'success': False, 'message': 'Database error'}), 500
-    try:
-        cursor = conn.cursor(dictionary=True)
+    key = f"teacher:{teacher_id}:schedule"
+    cached = cache_get(key)
+    if cached:
+        return json_response(cached)
+    with get_conn() as conn:
+        if not conn: return jsonify({'success': False, 'message': 'Database error'}), 500
+        cursor = conn.cursor()
         query = """
-            SELECT s.day_of_week, s.start_time, s.end_time, s.batch,
+            SELECT s.day_of_week, TIME_FORMAT(s.start_time, '%H:%i:%S') AS start_time,
+                   TIME_FORMAT(s.end_time, '%H:%i:%S') AS end_time, s.batch,
                    c.class_name, sub.subject_name
             FROM Schedules s
             JOIN Classes c ON s.class_id = c.class_id
@@ -87,26 +213,23 @@ def get_teacher_schedule():
             WHERE s.teacher_id = %s
         """
         cursor.execute(query, (teacher_id,))
-        schedule = cursor.fetchall()
-        for item in schedule:
-            item['start_time'] = str(item['start_time'])
-            item['end_time'] = str(item['end_time'])
-        return jsonify({'success': True, 'data': schedule})
-    finally:
-        if conn.is_connected(): conn.close()
+        columns = cursor.column_names
+        schedule = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        payload = app.json.dumps({'success': True, 'data': schedule})
+        cache_set(key, SCHEDULE_CACHE_TTL, payload)
+        return json_response(payload)
 
 @app.route('/api/teacher/today_classes')
-@teacher_required
 def get_today_classes():
     """Fetches classes scheduled for the current day for the logged-in teacher."""
     teacher_id = session.get('user_id')
-    today_name = datetime.datetime.now().strftime('%A')
-    conn = create_connection()
-    if not conn: return jsonify({'success': False, 'message': 'Database error'}), 500
-    try:
-        cursor = conn.cursor(dictionary=True)
+    today_name = _today_name(int(time.time() // 60))
+    with get_conn() as conn:
+        if not conn: return jsonify({'success': False, 'message': 'Database error'}), 500
+        cursor = conn.cursor()
         query = """
-            SELECT s.schedule_id, s.start_time, s.end_time, s.batch,
+            SELECT s.schedule_id, TIME_FORMAT(s.start_time, '%H:%i:%S') AS start_time,
+                   TIME_FORMAT(s.end_time, '%H:%i:%S') AS end_time, s.batch,
                    c.class_name, sub.subject_name
             FROM Schedules s
             JOIN Classes c ON s.class_id = c.class_id
@@ -115,22 +238,20 @@ def get_today_classes():
             ORDER BY s.start_time
         """
         cursor.execute(query, (teacher_id, today_name))
-        classes = cursor.fetchall()
-        for item in classes:
-            item['start_time'] = str(item['start_time'])
-            item['end_time'] = str(item['end_time'])
+        columns = cursor.column_names
+        classes = [dict(zip(columns, row)) for row in cursor.fetchall()]
         return jsonify({'success': True, 'data': classes})
-    finally:
-        if conn.is_connected(): conn.close()
 
 @app.route('/api/teacher/all_classes')
-@teacher_required
 def get_all_teacher_classes():
     """Fetches all unique classes assigned to the teacher."""
     teacher_id = session.get('user_id')
-    conn = create_connection()
-    if not conn: return jsonify({'success': False, 'message': 'Database error'}), 500
-    try:
+    key = f"teacher:{teacher_id}:all_classes"
+    cached = cache_get(key)
+    if cached:
+        return json_response(cached)
+    with get_conn() as conn:
+        if not conn: return jsonify({'success': False, 'message': 'Database error'}), 500
         cursor = conn.cursor(dictionary=True)
         query = """
             SELECT DISTINCT s.schedule_id, c.class_name, sub.subject_name, s.batch
@@ -141,52 +262,47 @@ def get_all_teacher_classes():
             ORDER BY c.class_name, sub.subject_name, s.batch
         """
         cursor.execute(query, (teacher_id,))
-        return jsonify({'success': True, 'data': cursor.fetchall()})
-    finally:
-        if conn.is_connected(): conn.close()
+        payload = app.json.dumps({'success': True, 'data': cursor.fetchall()})
+        cache_set(key, SCHEDULE_CACHE_TTL, payload)
+        return json_response(payload)
 
 
 # MODIFIED: Logic simplified to fetch students by batch only
 @app.route('/api/teacher/class_students')
-@teacher_required
 def get_class_students():
     """Fetches all students belonging to the batch of a given schedule."""
     schedule_id = request.args.get('schedule_id')
     if not schedule_id:
         return jsonify({'success': False, 'message': 'Schedule ID is required.'}), 400
 
-    conn = create_connection()
-    if not conn: return jsonify({'success': False, 'message': 'Database error'}), 500
-
-    try:
-        cursor = conn.cursor(dictionary=True)
-
-        # Step 1: Find the batch for the given schedule
-        cursor.execute("SELECT batch FROM Schedules WHERE schedule_id = %s", (schedule_id,))
-        schedule_info = cursor.fetchone()
-
-        if not schedule_info:
-            return jsonify({'success': False, 'message': 'Schedule not found.'}), 404
-
-        batch = schedule_info['batch']
-
-        # Step 2: Get all students who are in that batch (class_id check removed)
-        query = """
-            SELECT student_id, name, email, batch
-            FROM Students
-            WHERE batch = %s
-            ORDER BY name;
-        """
-        cursor.execute(query, (batch,))
-        students = cursor.fetchall()
-        return jsonify({'success': True, 'data': students})
-    except mysql.connector.Error as err:
-        return jsonify({'success': False, 'message': f"Database Error: {err}"}), 500
-    finally:
-        if conn.is_connected(): conn.close()
+    with get_conn() as conn:
+        if not conn: return jsonify({'success': False, 'message': 'Database error'}), 500
+
+        try:
+            cursor = conn.cursor()
+
+            # Students of the schedule's batch in one round-trip; the LEFT JOIN keeps a
+            # single NULL row for a schedule with no students so "not found" stays detectable.
+            query = """
+                SELECT st.student_id, st.name, st.email, st.batch
+                FROM Schedules s
+                LEFT JOIN Students st ON st.batch = s.batch
+                WHERE s.schedule_id = %s
+                ORDER BY st.name
+            """
+            cursor.execute(query, (schedule_id,))
+            rows = cursor.fetchall()
+
+            if not rows:
+                return jsonify({'success': False, 'message': 'Schedule not found.'}), 404
+
+            columns = cursor.column_names
+            students = [dict(zip(columns, row)) for row in rows if row[0] is not None]
+            return jsonify({'success': True, 'data': students})
+        except mysql.connector.Error as err:
+            return jsonify({'success': False, 'message': f"Database Error: {err}"}), 500
 
 @app.route('/api/teacher/mark_attendance', methods=['POST'])
-@teacher_required
 def mark_attendance():
     """Saves attendance data for multiple students."""
     data = request.get_json()
@@ -195,28 +311,30 @@ def mark_attendance():
     attendance_data = data.get('attendance_data')
     if not all([schedule_id, date, attendance_data]):
         return jsonify({'success': False, 'message': 'Missing required data.'}), 400
-    conn = create_connection()
-    if not conn: return jsonify({'success': False, 'message': 'Database error'}), 500
-    try:
-        cursor = conn.cursor()
-        query = """
-            INSERT INTO attendance (student_id, schedule_id, attendance_date, status)
-            VALUES (%s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE status = VALUES(status)
-        """
-        records = [(item['student_id'], schedule_id, date, item['status']) for item in attendance_data]
-        cursor.executemany(query, records)
-        conn.commit()
-        return jsonify({'success': True, 'message': f'Attendance for {cursor.rowcount} students saved.'})
-    except mysql.connector.Error as err:
-        conn.rollback()
-        return jsonify({'success': False, 'message': str(err)}), 500
-    finally:
-        if conn.is_connected(): conn.close()
+    with get_conn() as conn:
+        if not conn: return jsonify({'success': False, 'message': 'Database error'}), 500
+        try:
+            cursor = conn.cursor()
+            # Kept as a plain VALUES (...) list with no trailing semicolon so the connector
+            # rewrites executemany into a single multi-row INSERT per batch.
+            query = """
+                INSERT INTO attendance (student_id, schedule_id, attendance_date, status)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE status = VALUES(status)
+            """
+            records = [(item['student_id'], schedule_id, date, item['status']) for item in attendance_data]
+            saved = 0
+            for i in range(0, len(records), ATTENDANCE_BATCH_SIZE):
+                cursor.executemany(query, records[i:i + ATTENDANCE_BATCH_SIZE])
+                saved += cursor.rowcount
+            conn.commit()
+            return jsonify({'success': True, 'message': f'Attendance for {saved} students saved.'})
+        except mysql.connector.Error as err:
+            conn.rollback()
+            return jsonify({'success': False, 'message': str(err)}), 500
 
 # MODIFIED: Logic simplified to fetch students by batch only
 @app.route('/api/teacher/attendance')
-@teacher_required
 def view_attendance():
     """
     Fetches a complete student list for a given schedule and date based on batch.
@@ -227,58 +345,37 @@ def view_attendance():
     if not schedule_id or not date:
         return jsonify({'success': False, 'message': 'Schedule ID and date are required.'}), 400
 
-    conn = create_connection()
-    if not conn:
-        return jsonify({'success': False, 'message': 'Database error'}), 500
-
-    try:
-        cursor = conn.cursor(dictionary=True)
-
-        # Step 1: Find the batch for the given schedule
-        cursor.execute("SELECT batch FROM Schedules WHERE schedule_id = %s", (schedule_id,))
-        schedule_info = cursor.fetchone()
-        if not schedule_info:
-            return jsonify({'success': False, 'message': 'Schedule not found.'}), 404
-
-        batch = schedule_info['batch']
-
-        # Step 2: Get all students belonging to that batch (class_id check removed)
-        cursor.execute(
-            "SELECT student_id, name, email FROM Students WHERE batch = %s ORDER BY name",
-            (batch,)
-        )
-        all_students = cursor.fetchall()
-
-        # Step 3: Get existing attendance records for that day
-        cursor.execute("""
-            SELECT student_id, status, timestamp
-            FROM attendance
-            WHERE schedule_id = %s AND attendance_date = %s
-        """, (schedule_id, date))
-        attendance_records = {rec['student_id']: rec for rec in cursor.fetchall()}
-
-        # Step 4: Merge the two lists
-        full_attendance_list = []
-        for student in all_students:
-            record = attendance_records.get(student['student_id'])
-            status = record['status'] if record else 'absent'
-            timestamp_str = str(record['timestamp']) if record and record.get('timestamp') else None
-
-            full_attendance_list.append({
-                'student_id': student['student_id'],
-                'student_name': student['name'],
-                'student_email': student['email'],
-                'status': status,
-                'timestamp': timestamp_str
-            })
-
-        return jsonify({'success': True, 'data': full_attendance_list})
-    except mysql.connector.Error as err:
-        return jsonify({'success': False, 'message': f"Database error: {str(err)}"}), 500
-    finally:
-        if conn.is_connected():
-            conn.close()
+    with get_conn() as conn:
+        if not conn:
+            return jsonify({'success': False, 'message': 'Database error'}), 500
+
+        try:
+            cursor = conn.cursor()
+
+            # Students of the schedule's batch with that day's attendance merged in;
+            # students without a record default to 'absent'.
+            cursor.execute("""
+                SELECT st.student_id, st.name AS student_name, st.email AS student_email,
+                       COALESCE(a.status, 'absent') AS status,
+                       CAST(a.timestamp AS CHAR) AS timestamp
+                FROM Schedules sc
+                LEFT JOIN Students st ON st.batch = sc.batch
+                LEFT JOIN attendance a ON a.student_id = st.student_id
+                    AND a.schedule_id = sc.schedule_id
+                    AND a.attendance_date = %s
+                WHERE sc.schedule_id = %s
+                ORDER BY st.name
+            """, (date, schedule_id))
+            rows = cursor.fetchall()
+            if not rows:
+                return jsonify({'success': False, 'message': 'Schedule not found.'}), 404
+
+            columns = cursor.column_names
+            full_attendance_list = [dict(zip(columns, row)) for row in rows if row[0] is not None]
+            return jsonify({'success': True, 'data': full_attendance_list})
+        except mysql.connector.Error as err:
+            return jsonify({'success': False, 'message': f"Database error: {str(err)}"}), 500
 
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5001)
\ No newline at end of file
+    app.run(port=5001)
\ No newline at end of file
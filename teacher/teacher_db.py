@@ -1,19 +1,84 @@
 import mysql.connector
-from mysql.connector import Error
+import threading
+from contextlib import contextmanager
+from mysql.connector import Error, HAVE_CEXT, pooling
 
-def create_connection():
-    """Create and return a database connection object for the teacher portal."""
-    
+def _gevent_patched():
+    """True when gevent has monkey-patched sockets (e.g. under gunicorn's gevent worker)."""
     try:
-        connection = mysql.connector.connect(
-            host='localhost',        # Your database host
-            database='portal',          # The name of your database
-            user='root',             # Your database username
-            password='aditya',       # Your database password
-            auth_plugin='mysql_native_password'
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('socket')
+
+USING_GEVENT = _gevent_patched()
+
+DB_CONFIG = {
+    'host': 'localhost',        # Your database host
+    'database': 'portal',          # The name of your database
+    'user': 'root',             # Your database username
+    'password': 'aditya',       # Your database password
+    'auth_plugin': 'mysql_native_password',
+    # Decode rows with the C extension when installed, except under gevent: the pure-Python
+    # protocol uses patched sockets and yields while waiting on MySQL, the C extension blocks.
+    'use_pure': not HAVE_CEXT or USING_GEVENT
+}
+
+# Keep the server's wait_timeout above the idle time of pooled connections.
+POOL_SIZE = 10
+POOL_TIMEOUT = 10  # seconds a request waits for a free pooled connection
+
+_pool = None
+# The pool raises instead of waiting when it is empty, so checkouts queue here first.
+# Under gevent, threading is monkey-patched and this becomes a greenlet-aware semaphore.
+_slots = threading.BoundedSemaphore(POOL_SIZE)
+
+def get_pool():
+    """Create the teacher portal connection pool on first use and return it."""
+    global _pool
+    if _pool is None:
+        _pool = pooling.MySQLConnectionPool(
+            pool_name='teacher',
+            pool_size=POOL_SIZE,
+            pool_reset_session=False,
+            **DB_CONFIG
         )
-        if connection.is_connected():
-            return connection
+    return _pool
+
+def create_connection():
+    """Return a pooled database connection; closing it hands it back to the pool.
+
+    Checking out pings the connection and reconnects it if the server dropped it.
+    Use get_conn(), which waits for a free connection instead of failing when all are in use.
+    """
+    try:
+        return get_pool().get_connection()
     except Error as e:
         print(f"Error while connecting to MySQL: {e}")
         return None
+
+# Handlers use plain text-protocol cursors. A prepared cursor opened per request costs a
+# prepare, execute and statement close instead of one query, and statements can't safely be
+# kept across checkouts because the pool may reconnect a connection and drop them.
+@contextmanager
+def get_conn():
+    """Yield a pooled connection (None if the database is unavailable) and release it on exit."""
+    if not _slots.acquire(timeout=POOL_TIMEOUT):
+        print("Error while connecting to MySQL: no pooled connection free")
+        yield None
+        return
+    conn = None
+    try:
+        conn = create_connection()
+        yield conn
+    finally:
+        if conn:
+            try:
+                # Drain a partly read result so the next checkout can query right away, and end
+                # the transaction so it doesn't keep reading from this request's snapshot.
+                conn.consume_results()
+                conn.rollback()
+            except Error:
+                pass
+            conn.close()
+        _slots.release()